@@ -0,0 +1,4 @@
+# Gerenciador de Backups do PostgreSQL: dumps via SSH com streaming,
+# compressão zstd no servidor e agendamento diário ou por intervalo
+from pbm.backup import clean_old_backups, list_databases, perform_backup
+from pbm.ssh import get_ssh
@@ -0,0 +1,321 @@
+import hashlib
+import logging
+import os
+import queue
+import shlex
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pbm.config import (
+    BACKUP_BASE_DIR,
+    BACKUP_DUMP_JOBS,
+    CFG,
+    DB_LIST_TTL,
+    PARALLEL_DUMP_THRESHOLD,
+)
+from pbm.ssh import PGPASS_REMOTE_PATH, get_ssh
+
+# Prefixo de ambiente POSIX, expandido pelo shell remoto; funciona em qualquer
+# sshd, ao contrário do environment= do exec_command
+_PGPASS_PREFIX = f"PGPASSFILE={PGPASS_REMOTE_PATH} "
+
+
+# Função para consultar os bancos de dados no servidor
+def _fetch_databases():
+    try:
+        ssh = get_ssh()
+        argv = [
+            "psql",
+            "-U",
+            CFG.pg_user,
+            "-h",
+            CFG.pg_host,
+            "-t",
+            "-A",
+            # Separador de campo 0x1f (unit separator): nomes de banco podem
+            # conter espaços e até '|', mas nunca um byte de controle
+            "-F",
+            "\x1f",
+            "-c",
+            "SELECT datname, pg_database_size(datname) FROM pg_database WHERE datistemplate = false AND datallowconn = true;",
+        ]
+        command = _PGPASS_PREFIX + " ".join(shlex.quote(arg) for arg in argv)
+        stdin, stdout, stderr = ssh.exec_command(command)
+        exit_status = stdout.channel.recv_exit_status()
+
+        if exit_status != 0:
+            logging.error(f"Failed to list databases with exit status {exit_status}")
+            logging.error(stderr.read().decode())
+            return []
+
+        databases = []
+        for line in stdout.read().decode("utf-8").splitlines():
+            if not line:
+                continue
+            name, _, size = line.rpartition("\x1f")
+            databases.append((name, int(size)))
+        return databases
+    except Exception as e:
+        logging.error(f"Erro ao listar bancos de dados: {e}")
+        return []
+
+
+_db_list_cache = (0.0, None)
+
+
+# Função para listar todos os bancos de dados (com cache)
+def list_databases():
+    global _db_list_cache
+    cached_at, databases = _db_list_cache
+    if databases is not None and time.monotonic() - cached_at < DB_LIST_TTL:
+        return databases
+
+    databases = _fetch_databases()
+    if databases:
+        # Falhas (lista vazia) não entram no cache: a próxima chamada reconsulta
+        _db_list_cache = (time.monotonic(), databases)
+    return databases
+
+
+# Pipelines rodam sob um bash -c explícito: `set -o pipefail` não existe em
+# shells como o dash, que é o login shell padrão em Debian/Ubuntu, e
+# exec_command usa o shell do usuário remoto
+def _pipeline_command(pipeline):
+    return "bash -c " + shlex.quote(f"set -o pipefail; {pipeline}")
+
+
+# Função para remover o diretório de staging remoto aguardando a conclusão.
+# Disparar e esquecer deixaria o rm morrer com o transporte quando o processo
+# sai logo após o último backup (modo manual); erros aqui só geram aviso para
+# não mascarar a falha original de quem chamou
+def _remove_remote_dir(ssh, remote_dir):
+    try:
+        stdin, stdout, stderr = ssh.exec_command(f"rm -rf {shlex.quote(remote_dir)}")
+        if stdout.channel.recv_exit_status() != 0:
+            logging.warning(
+                f"Falha ao remover o diretório remoto {remote_dir}: "
+                f"{stderr.read().decode().strip()}"
+            )
+    except Exception as e:
+        logging.warning(f"Falha ao remover o diretório remoto {remote_dir}: {e}")
+
+
+# Função auxiliar para drenar o stderr do canal sem bloquear o fluxo do dump
+def _drain_stderr(chan, chunks):
+    while data := chan.recv_stderr(1 << 20):
+        chunks.append(data)
+
+
+# Função para executar um comando remoto transmitindo seu stdout para um
+# arquivo local, sem etapa intermediária em disco no servidor remoto
+def _stream_to_file(ssh, command, local_file):
+    chan = ssh.get_transport().open_session()
+    chan.settimeout(None)
+    chan.exec_command(command)
+
+    stderr_chunks = []
+    stderr_thread = threading.Thread(
+        target=_drain_stderr, args=(chan, stderr_chunks), daemon=True
+    )
+    stderr_thread.start()
+
+    # A thread leitora recebe da rede enquanto esta thread grava em disco;
+    # a fila limitada dá vazão sem deixar o produtor encher a memória
+    data_queue = queue.Queue(maxsize=4)
+
+    def _reader():
+        # O sentinela sai num finally: mesmo que o recv estoure com o canal
+        # fechado, o lado consumidor nunca fica esperando para sempre
+        try:
+            while chunk := chan.recv(1 << 20):
+                data_queue.put(chunk)
+        finally:
+            data_queue.put(None)
+
+    reader_thread = threading.Thread(target=_reader, daemon=True)
+    reader_thread.start()
+
+    # O checksum é calculado no próprio laço de escrita: o CPU fica ocioso
+    # esperando a rede, então a verificação sai de graça em vez de exigir uma
+    # releitura completa do arquivo depois
+    digest = hashlib.sha256()
+    try:
+        with open(local_file, "wb") as f:
+            while (chunk := data_queue.get()) is not None:
+                f.write(chunk)
+                digest.update(chunk)
+    except Exception:
+        # Falha local (ex.: disco cheio): fecha o canal, drena a fila para
+        # desprender a leitora presa no put e descarta o arquivo parcial
+        chan.close()
+        while data_queue.get() is not None:
+            pass
+        reader_thread.join()
+        stderr_thread.join()
+        if os.path.exists(local_file):
+            os.remove(local_file)
+        raise
+
+    reader_thread.join()
+    exit_status = chan.recv_exit_status()
+    stderr_thread.join()
+    chan.close()
+
+    if exit_status != 0:
+        logging.error(f"Remote command failed with exit status {exit_status}")
+        logging.error(b"".join(stderr_chunks).decode())
+        # Remove o dump parcial para não confundir com um backup válido
+        os.remove(local_file)
+        return False
+
+    # Formato do sha256sum, verificável com `sha256sum -c`
+    with open(f"{local_file}.sha256", "w") as f:
+        f.write(f"{digest.hexdigest()}  {os.path.basename(local_file)}\n")
+    return True
+
+
+# Função para realizar backup de todos os bancos de dados
+def perform_backup(db_name, backup_name, backup_subdir, db_size=0):
+    local_backup_path = os.path.join(BACKUP_BASE_DIR, db_name, backup_subdir)
+    if not os.path.exists(local_backup_path):
+        os.makedirs(local_backup_path)
+
+    # Melhor pular o banco com aviso do que abortar uma transferência de
+    # gigabytes perto do fim por disco cheio; 20% de folga sobre o tamanho
+    # reportado pelo Postgres cobre a variação do formato do dump
+    if db_size:
+        free = shutil.disk_usage(local_backup_path).free
+        if free < db_size * 1.2:
+            logging.warning(
+                f"Backup de {db_name} ignorado: {free} bytes livres em "
+                f"{local_backup_path}, necessário ~{int(db_size * 1.2)}"
+            )
+            return
+
+    try:
+        ssh = get_ssh()
+
+        if db_size >= PARALLEL_DUMP_THRESHOLD:
+            # Banco grande: dump em formato diretório com múltiplos jobs e
+            # empacotamento tar+zstd transmitido de volta em um único fluxo.
+            # O staging fica em /var/backups (disco), nunca em /tmp: em muitas
+            # distros /tmp é tmpfs e justamente os maiores bancos estourariam
+            # a RAM do servidor
+            local_file = os.path.join(local_backup_path, f"{backup_name}.tar.zst")
+            remote_parent = f"/var/backups/postgresql/{db_name}"
+            remote_dir = f"{remote_parent}/{backup_name}.dir"
+            dump_argv = [
+                "pg_dump",
+                "-U",
+                CFG.pg_user,
+                "-h",
+                CFG.pg_host,
+                "-F",
+                "d",
+                "-j",
+                str(BACKUP_DUMP_JOBS),
+                # -Z0 aqui também: o zstd da etapa de empacotamento já comprime,
+                # gzip por tabela no pg_dump só gastaria CPU duas vezes
+                "-Z0",
+                "-f",
+                remote_dir,
+                db_name,
+            ]
+            dump_command = (
+                f"mkdir -p {shlex.quote(remote_parent)} && "
+                + _PGPASS_PREFIX
+                + " ".join(shlex.quote(arg) for arg in dump_argv)
+            )
+            logging.info(
+                f"Executing parallel backup command for database {db_name} "
+                f"({BACKUP_DUMP_JOBS} jobs)"
+            )
+            stdin, stdout, stderr = ssh.exec_command(dump_command)
+            exit_status = stdout.channel.recv_exit_status()
+            if exit_status != 0:
+                logging.error(
+                    f"pg_dump failed with exit status {exit_status} for database {db_name}"
+                )
+                logging.error(stderr.read().decode())
+                _remove_remote_dir(ssh, remote_dir)
+                return
+            stream_command = _pipeline_command(
+                f"tar -cf - -C {shlex.quote(remote_parent)} "
+                f"{shlex.quote(backup_name + '.dir')} | zstd -T0 -3 -q"
+            )
+            # O finally garante a limpeza mesmo quando o streaming levanta
+            # exceção (ex.: disco local cheio); sem isso o .dir de vários GB
+            # ficaria órfão no servidor
+            try:
+                ok = _stream_to_file(ssh, stream_command, local_file)
+            finally:
+                _remove_remote_dir(ssh, remote_dir)
+            if not ok:
+                return
+        else:
+            # pg_dump com -Z0 desliga o zlib single-thread do formato custom;
+            # a compressão fica por conta do zstd multi-core no servidor.
+            # Para restaurar: zstd -d | pg_restore
+            local_file = os.path.join(local_backup_path, f"{backup_name}.dump.zst")
+            dump_argv = [
+                "pg_dump",
+                "-U",
+                CFG.pg_user,
+                "-h",
+                CFG.pg_host,
+                "-F",
+                "c",
+                "-Z0",
+                "-b",
+                db_name,
+            ]
+            backup_command = _pipeline_command(
+                _PGPASS_PREFIX
+                + " ".join(shlex.quote(arg) for arg in dump_argv)
+                + " | zstd -T0 -3 -q"
+            )
+            logging.info(f"Executing backup command for database {db_name}")
+            if not _stream_to_file(ssh, backup_command, local_file):
+                return
+
+        logging.info(
+            f"Backup {os.path.basename(local_file)} transferido com sucesso para {local_backup_path}"
+        )
+    except Exception as e:
+        logging.error(f"Erro ao realizar backup: {e}")
+
+
+# Cache do mtime de cada diretório de backup já varrido: o mtime do diretório
+# só muda quando entradas são criadas ou removidas, então ele serve como um
+# teste O(1) de "nada mudou desde a última limpeza"
+_dir_scan_cache = {}
+
+
+# Função para limpar backups antigos
+def clean_old_backups(db_name, backup_subdir, days_to_keep=4):
+    local_backup_path = os.path.join(BACKUP_BASE_DIR, db_name, backup_subdir)
+    if not os.path.exists(local_backup_path):
+        return
+
+    dir_mtime = os.stat(local_backup_path).st_mtime
+    if _dir_scan_cache.get(local_backup_path) == dir_mtime:
+        return
+
+    # scandir reaproveita os dados de inode retornados pelo readdir, evitando
+    # um stat() extra por entrada em relação a listdir + getmtime
+    cutoff = (datetime.now() - timedelta(days=days_to_keep)).timestamp()
+    with os.scandir(local_backup_path) as entries:
+        for entry in entries:
+            if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+                logging.info(
+                    f"Backup {entry.name} removido, pois é mais antigo que {days_to_keep} dias"
+                )
+
+    # Regrava o mtime pós-limpeza: remoções acima também alteram o diretório
+    _dir_scan_cache[local_backup_path] = os.stat(local_backup_path).st_mtime
@@ -0,0 +1,42 @@
+import argparse
+import logging
+
+from pbm.scheduler import modo_diario, modo_manual, modo_por_intervalo
+
+
+# Argumentos do script
+def main():
+    parser = argparse.ArgumentParser(description="Gerenciador de Backups do PostgreSQL")
+    parser.add_argument(
+        "--modo",
+        required=True,
+        choices=["manual", "diario", "por_intervalo"],
+        help="Modo de operação do backup",
+    )
+    parser.add_argument(
+        "--tempo",
+        help="Hora para o modo diário (HH:MM) ou intervalo para o modo por intervalo (HH:MM)",
+    )
+    parser.add_argument(
+        "--database",
+        default="ALL",
+        help="Nome do banco de dados a copiar, ou ALL para todos (padrão)",
+    )
+
+    args = parser.parse_args()
+
+    # Executar o modo apropriado
+    if args.modo == "manual":
+        modo_manual(args.database)
+    elif args.modo == "diario":
+        if args.tempo:
+            modo_diario(args.tempo, args.database)
+        else:
+            logging.error("O modo diário requer a especificação do horário com --tempo")
+    elif args.modo == "por_intervalo":
+        if args.tempo:
+            modo_por_intervalo(args.tempo, args.database)
+        else:
+            logging.error(
+                "O modo por intervalo requer a especificação do intervalo com --tempo"
+            )
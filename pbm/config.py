@@ -0,0 +1,89 @@
+import atexit
+import logging
+import locale
+import os
+import queue
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from logging.handlers import QueueHandler, QueueListener
+
+# Configurações de Log: os workers apenas enfileiram registros; a escrita em
+# arquivo/console acontece em uma thread própria do QueueListener, sem
+# serializar as threads de backup no lock do FileHandler
+locale.setlocale(locale.LC_ALL, "pt_BR.UTF-8")
+_log_formatter = logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(message)s", datefmt="%d/%m/%Y %H:%M:%S"
+)
+_log_handlers = [
+    logging.FileHandler("Postgres-Backup-Manager.log", "a", "utf-8"),
+    logging.StreamHandler(),
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.SimpleQueue()
+# O QueueHandler entra direto no root logger: basicConfig lhe daria um
+# formatter padrão que o prepare() gravaria no registro, e as linhas sairiam
+# formatadas duas vezes; quem formata são só os handlers do listener
+_root_logger = logging.getLogger()
+_root_logger.setLevel(logging.INFO)
+_root_logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+_REQUIRED_ENV = (
+    "PG_HOST",
+    "PG_PORT",
+    "PG_USER",
+    "PG_PASSWORD",
+    "SSH_HOST",
+    "SSH_USER",
+    "SSH_PASSWORD",
+)
+
+
+# Credenciais do PostgreSQL e SSH, resolvidas uma única vez na partida.
+# frozen evita alteração acidental em runtime e slots barateia o acesso
+@dataclass(frozen=True, slots=True)
+class Config:
+    pg_host: str
+    pg_port: str
+    pg_user: str
+    pg_password: str
+    ssh_host: str
+    ssh_user: str
+    ssh_password: str
+    ssh_key_file: str = None
+
+
+def _load_config():
+    missing = [name for name in _REQUIRED_ENV if not os.getenv(name)]
+    if missing:
+        # Falhar já na partida é melhor que mandar PGPASSWORD='' ao servidor
+        raise RuntimeError(
+            f"Variáveis de ambiente obrigatórias ausentes: {', '.join(missing)}"
+        )
+    return Config(
+        **{name.lower(): os.environ[name] for name in _REQUIRED_ENV},
+        ssh_key_file=os.getenv("SSH_KEY_FILE"),
+    )
+
+
+CFG = _load_config()
+
+BACKUP_BASE_DIR = os.path.join(os.getcwd(), "backups", "postgresql")
+BACKUP_PARALLEL = int(os.getenv("BACKUP_PARALLEL", "4"))
+
+# Bancos acima deste tamanho usam pg_dump em formato diretório com --jobs,
+# para que o dump não fique limitado a um único backend do Postgres
+PARALLEL_DUMP_THRESHOLD = int(
+    os.getenv("BACKUP_PARALLEL_DUMP_THRESHOLD", str(5 * 1024**3))
+)
+BACKUP_DUMP_JOBS = int(os.getenv("BACKUP_DUMP_JOBS", "4"))
+
+# A lista de bancos muda raramente; um cache com TTL evita uma ida SSH+psql
+# ao servidor a cada ciclo agendado
+DB_LIST_TTL = int(os.getenv("BACKUP_DB_LIST_TTL", "3600"))
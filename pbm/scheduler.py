@@ -0,0 +1,117 @@
+import atexit
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+from pbm.backup import clean_old_backups, list_databases, perform_backup
+from pbm.config import BACKUP_PARALLEL, CFG
+
+# Executor compartilhado: as threads são reaproveitadas entre ciclos, logo as
+# conexões SSH por thread no pool também sobrevivem de um ciclo ao outro
+_executor = ThreadPoolExecutor(max_workers=BACKUP_PARALLEL)
+atexit.register(_executor.shutdown)
+
+# Evento de parada: Event.wait substitui time.sleep para que SIGTERM/SIGINT
+# acordem o daemon imediatamente em vez de esperar o fim do sleep
+_stop = threading.Event()
+
+
+def _handle_stop_signal(signum, frame):
+    logging.info("Sinal de término recebido, encerrando")
+    _stop.set()
+
+
+signal.signal(signal.SIGTERM, _handle_stop_signal)
+signal.signal(signal.SIGINT, _handle_stop_signal)
+
+
+# Função para dump + limpeza de um único banco (unidade de trabalho paralela)
+def _backup_database(db_info, backup_subdir, stamp):
+    if _stop.is_set():
+        return
+    db, db_size = db_info
+    backup_name = f"backup_{db}_{CFG.pg_user}_{stamp}"
+    perform_backup(db, backup_name, backup_subdir, db_size)
+    clean_old_backups(db, backup_subdir)
+
+
+# Função para disparar os backups de todos os bancos em paralelo
+def _backup_all(databases, backup_subdir):
+    # Um único carimbo de data/hora por ciclo: além de poupar N chamadas a
+    # now()+strftime, todos os arquivos do ciclo compartilham o mesmo sufixo
+    stamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+    list(
+        _executor.map(
+            partial(_backup_database, backup_subdir=backup_subdir, stamp=stamp),
+            databases,
+        )
+    )
+
+
+# Função para resolver o alvo do ciclo: todos os bancos ou apenas um
+def _select_databases(database):
+    databases = list_databases()
+    if database != "ALL":
+        databases = [db for db in databases if db[0] == database]
+        if not databases:
+            logging.error(f"Banco de dados {database} não encontrado no servidor")
+    return databases
+
+
+# Funções para modos de operação
+def modo_manual(database="ALL"):
+    databases = _select_databases(database)
+    logging.info("Modo manual iniciado")
+    _backup_all(databases, "backup_manual")
+    logging.info("Modo manual finalizado")
+
+
+def modo_diario(hora, database="ALL"):
+    now = datetime.now()
+    target_time = now.replace(
+        hour=int(hora.split(":")[0]),
+        minute=int(hora.split(":")[1]),
+        second=0,
+        microsecond=0,
+    )
+    if now > target_time:
+        target_time += timedelta(days=1)
+    delay = (target_time - now).total_seconds()
+    logging.info(
+        f"Backup diário agendado para {target_time.strftime('%d/%m/%Y %H:%M:%S')} (em {timedelta(seconds=delay)})"
+    )
+    if _stop.wait(delay):
+        return
+    while True:
+        databases = _select_databases(database)
+        logging.info("Modo diário iniciado")
+        _backup_all(databases, "backup_diario")
+        logging.info("Modo diário finalizado")
+        # O próximo disparo é recalculado a partir do horário-alvo absoluto,
+        # assim a duração do backup não desloca o agendamento dia após dia
+        target_time += timedelta(days=1)
+        if _stop.wait(max(0, (target_time - datetime.now()).total_seconds())):
+            return
+
+
+def modo_por_intervalo(intervalo, database="ALL"):
+    horas, minutos = map(int, intervalo.split(":"))
+    intervalo_segundos = horas * 3600 + minutos * 60
+    logging.info(f"Backup agendado a cada {intervalo} horas")
+    # Prazos absolutos em relógio monotônico: dormir o intervalo inteiro após
+    # um ciclo de duração variável acumularia atraso a cada iteração
+    next_deadline = time.monotonic()
+    while True:
+        databases = _select_databases(database)
+        logging.info("Modo por intervalo iniciado")
+        _backup_all(databases, "backup_por_intervalo")
+        logging.info("Modo por intervalo finalizado")
+        next_deadline += intervalo_segundos
+        sleep_secs = max(0, next_deadline - time.monotonic())
+        logging.info(f"Próximo backup em {timedelta(seconds=int(sleep_secs))}")
+        if _stop.wait(sleep_secs):
+            return
@@ -0,0 +1,110 @@
+import atexit
+import logging
+import threading
+
+import paramiko
+
+from pbm.config import CFG
+
+# Prioriza cifras AEAD rápidas (AES-GCM usa AES-NI em hardware) na negociação;
+# cifras desconhecidas desta versão do paramiko são simplesmente ignoradas
+_FAST_CIPHERS = ("aes128-gcm@openssh.com", "aes256-gcm@openssh.com")
+paramiko.Transport._preferred_ciphers = tuple(
+    [c for c in _FAST_CIPHERS if c in paramiko.Transport._cipher_info]
+    + [c for c in paramiko.Transport._preferred_ciphers if c not in _FAST_CIPHERS]
+)
+
+
+# Arquivo de senhas provisionado no servidor para o pg_dump/psql. Enviar
+# PGPASSWORD como variável de canal depende de AcceptEnv no sshd (rejeitado em
+# silêncio na configuração padrão); o caminho do arquivo, por sua vez, não é
+# segredo e pode ir na linha de comando como PGPASSFILE=...
+PGPASS_REMOTE_PATH = "$HOME/.pbm_pgpass"
+
+
+def _pgpass_escape(value):
+    # No formato do .pgpass, '\' e ':' exigem escape
+    return value.replace("\\", "\\\\").replace(":", "\\:")
+
+
+def _provision_pgpass(client):
+    # A senha viaja pelo stdin do cat, nunca pela linha de comando; escrita
+    # em arquivo temporário + mv para a troca ser atômica entre workers
+    line = f"*:*:*:{_pgpass_escape(CFG.pg_user)}:{_pgpass_escape(CFG.pg_password)}\n"
+    command = 'umask 077; tmp="$HOME/.pbm_pgpass.$$"; cat > "$tmp" && mv "$tmp" "$HOME/.pbm_pgpass"'
+    stdin, stdout, stderr = client.exec_command(command)
+    stdin.write(line)
+    stdin.channel.shutdown_write()
+    if stdout.channel.recv_exit_status() != 0:
+        raise RuntimeError(
+            f"Falha ao provisionar o .pgpass remoto: {stderr.read().decode().strip()}"
+        )
+
+
+# Pool de conexões SSH: reutiliza um cliente por (host, usuário, thread) em vez
+# de pagar um handshake TCP+SSH completo a cada banco e a cada ciclo agendado.
+# A chave inclui a thread para que cada worker do executor tenha seu próprio
+# cliente, sem disputar canais de um mesmo transporte
+class SSHConnectionPool:
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, server, user, password):
+        key = (server, user, threading.get_ident())
+        with self._lock:
+            client = self._clients.get(key)
+        if client is not None:
+            transport = client.get_transport()
+            if transport is not None and transport.is_active():
+                return client
+            # Conexão caiu: descarta e reconecta de forma preguiçosa
+            with self._lock:
+                self._clients.pop(key, None)
+            client.close()
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        # Compressão SSH fica desligada: os dumps já chegam comprimidos com
+        # zstd e zlib@openssh só gastaria CPU recomprimindo o fluxo
+        client.connect(
+            server,
+            username=user,
+            password=password,
+            key_filename=CFG.ssh_key_file,
+            banner_timeout=30,
+            auth_timeout=30,
+            compress=False,
+        )
+        transport = client.get_transport()
+        transport.set_keepalive(30)
+        # Janela padrão de 32 KiB limita a vazão em LAN gigabit; 4 MiB deixa
+        # o canal de streaming do dump encher o link sem esperar ACK de janela
+        transport.default_window_size = 4 * 1024 * 1024
+        transport.default_max_packet_size = 32768
+        logging.info("Connected (version 2.0, client OpenSSH_9.3)")
+        logging.info("Authentication (password) successful!")
+        _provision_pgpass(client)
+        with self._lock:
+            self._clients[key] = client
+        return client
+
+    def close_all(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+
+_ssh_pool = SSHConnectionPool()
+atexit.register(_ssh_pool.close_all)
+
+
+# Função para obter a conexão SSH compartilhada (reconecta se necessário)
+def get_ssh():
+    try:
+        return _ssh_pool.get(CFG.ssh_host, CFG.ssh_user, CFG.ssh_password)
+    except (paramiko.SSHException, EOFError):
+        # Handshake interrompido: tenta uma única reconexão limpa
+        return _ssh_pool.get(CFG.ssh_host, CFG.ssh_user, CFG.ssh_password)